@@ -3,12 +3,16 @@ import json
 import os
 import base64
 import datetime
-import requests
+from decimal import Decimal
+import httpx
+import orjson
 from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
 from dotenv import load_dotenv
 from PIL import Image
 import hashlib
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 
 # --------------------------------------------------
 # CONFIG
@@ -26,47 +30,172 @@ EXPLORER = os.getenv("EXPLORER")
 PINATA_API_KEY = os.getenv("PINATA_API_KEY")
 PINATA_SECRET_KEY = os.getenv("PINATA_SECRET_KEY")
 
-with open("TimeVaultNFT.json") as f:
-    CONTRACT_ABI = json.load(f)
+# Pourboire de priorité (constant, calculé une seule fois)
+GWEI_TIP = Web3.to_wei(Decimal("0.1"), "gwei")  # == 10**8
+
+@st.cache_resource
+def load_abi(path="TimeVaultNFT.json"):
+    """Charge l'ABI du contrat une seule fois (partagée entre reruns et sessions)"""
+    with open(path) as f:
+        return json.load(f)
+
+@st.cache_resource
+def get_w3():
+    """Provider Web3 réutilisé entre les reruns"""
+    return Web3(Web3.HTTPProvider(RPC_URL))
+
+@st.cache_resource
+def get_executor():
+    """Pool de threads partagé pour les uploads IPFS en arrière-plan"""
+    return ThreadPoolExecutor(max_workers=2)
+
+CONTRACT_ABI = load_abi()
+w3 = get_w3()
+EXECUTOR = get_executor()
+
+@st.cache_data(ttl=5, show_spinner=False)
+def current_gas_price():
+    """Gas price mis en cache quelques secondes (un seul appel RPC pour withdraw + burn)"""
+    return w3.eth.gas_price
+
+@st.cache_resource
+def get_contract(address):
+    """Instance du contrat mise en cache par adresse (checksum + proxies ABI calculés une fois)"""
+    return w3.eth.contract(
+        address=Web3.to_checksum_address(address),
+        abi=CONTRACT_ABI
+    )
+
+def batch_w3():
+    """Instance Web3 dédiée à un batch : le mode batch de web3.py est un état du provider,
+    il ne doit jamais être activé sur l'instance w3 partagée entre sessions et threads"""
+    return Web3(Web3.HTTPProvider(RPC_URL))
+
+def simulate_withdraw(contract, vault_id, address):
+    """Simule le withdraw et récupère le nonce en une seule requête JSON-RPC batch"""
+    withdraw_call = {
+        "from": address,
+        "to": contract.address,
+        "data": contract.encode_abi("withdraw", args=[vault_id])
+    }
+    
+    try:
+        bw3 = batch_w3()
+        with bw3.batch_requests() as batch:
+            batch.add(bw3.eth.get_transaction_count(address))
+            batch.add(bw3.eth.call(withdraw_call))
+            nonce, _ = batch.execute()
+    except Exception:
+        # RPC sans support du batch ou withdraw qui revert : appels séquentiels,
+        # pour que l'erreur du contrat remonte avec sa raison ("Vault still locked", ...)
+        nonce = w3.eth.get_transaction_count(address)
+        contract.functions.withdraw(vault_id).call({"from": address})
+    
+    return nonce
 
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
+def send_raw_transactions(signed_txs):
+    """Envoie des transactions signées en une seule requête JSON-RPC batch"""
+    try:
+        bw3 = batch_w3()
+        with bw3.batch_requests() as batch:
+            for signed_tx in signed_txs:
+                batch.add(bw3.eth.send_raw_transaction(signed_tx.raw_transaction))
+            batch.execute()
+    except Exception:
+        # RPC sans support du batch : envoi séquentiel des transactions pas encore reçues
+        for signed_tx in signed_txs:
+            try:
+                w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception as send_error:
+                try:
+                    w3.eth.get_transaction(signed_tx.hash)
+                except TransactionNotFound:
+                    raise send_error
+
+# --------------------------------------------------
+# ACCOUNT
+# --------------------------------------------------
+
+@st.cache_resource
+def account_from_env():
+    """Account dérivé une seule fois depuis la clé du .env"""
+    return w3.eth.account.from_key(PRIVATE_KEY)
+
+def get_account(private_key):
+    """Account de la session, re-dérivé seulement si la clé privée change"""
+    if st.session_state.get("pk_cached") != private_key:
+        if private_key == PRIVATE_KEY:
+            st.session_state.account = account_from_env()
+        else:
+            st.session_state.account = w3.eth.account.from_key(private_key)
+        st.session_state.pk_cached = private_key
+    
+    return st.session_state.account
 
 # --------------------------------------------------
 # IPFS FUNCTIONS
 # --------------------------------------------------
 
-def upload_to_pinata(file_bytes, filename="image.jpg"):
-    """Upload un fichier sur IPFS via Pinata"""
+@st.cache_resource
+def pinata_client():
+    """Client HTTP/2 partagé : les uploads Pinata sont multiplexés sur une seule connexion TLS"""
+    return httpx.Client(
+        http2=True,
+        headers={
+            "pinata_api_key": PINATA_API_KEY,
+            "pinata_secret_api_key": PINATA_SECRET_KEY
+        },
+        limits=httpx.Limits(max_connections=4),
+        timeout=60
+    )
+
+@st.cache_resource
+def pinata_key_fingerprint():
+    """Empreinte de la clé API Pinata, pour que les CID en cache restent liés au compte qui les a pinnés"""
+    return hashlib.sha256(PINATA_API_KEY.encode()).hexdigest()[:16]
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
+def _pin_file(key_fingerprint, sha256_hex, _file_bytes, filename):
+    """Pin un fichier sur Pinata, mis en cache (sur disque) par compte et SHA256 du contenu"""
     url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
     
-    headers = {
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_SECRET_KEY
-    }
-    
+    # httpx streame le corps multipart depuis le buffer (pas de copie complète en mémoire)
     files = {
-        "file": (filename, file_bytes)
+        "file": (filename, BytesIO(_file_bytes))
     }
     
+    response = pinata_client().post(url, files=files)
+    response.raise_for_status()
+    
+    return orjson.loads(response.content)["IpfsHash"]
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
+def _pin_json(key_fingerprint, payload_json):
+    """Pin un payload JSON déjà sérialisé sur Pinata, mis en cache (sur disque) par compte et contenu"""
+    url = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
+    
+    response = pinata_client().post(
+        url,
+        content=payload_json,
+        headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+    
+    return orjson.loads(response.content)["IpfsHash"]
+
+def upload_to_pinata(file_bytes, filename="image.jpg", sha256_hex=None):
+    """Upload un fichier sur IPFS via Pinata (un contenu déjà pinné n'est pas renvoyé)"""
+    if sha256_hex is None:
+        sha256_hex = hashlib.sha256(file_bytes).hexdigest()
+    
     try:
-        response = requests.post(url, files=files, headers=headers)
-        response.raise_for_status()
-        
-        ipfs_hash = response.json()["IpfsHash"]
+        ipfs_hash = _pin_file(pinata_key_fingerprint(), sha256_hex, file_bytes, filename)
         return ipfs_hash, None
     except Exception as e:
         return None, str(e)
 
 def upload_metadata_to_pinata(metadata):
-    """Upload les métadonnées JSON sur IPFS via Pinata"""
-    url = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_SECRET_KEY
-    }
-    
+    """Upload les métadonnées JSON sur IPFS via Pinata (un contenu déjà pinné n'est pas renvoyé)"""
     payload = {
         "pinataContent": metadata,
         "pinataMetadata": {
@@ -75,14 +204,24 @@ def upload_metadata_to_pinata(metadata):
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        ipfs_hash = response.json()["IpfsHash"]
+        ipfs_hash = _pin_json(pinata_key_fingerprint(), orjson.dumps(payload))
         return ipfs_hash, None
     except Exception as e:
         return None, str(e)
 
+def wait_for_image_upload():
+    """Attend la fin de l'upload IPFS de l'image lancé en arrière-plan"""
+    ipfs_hash, error = st.session_state.ipfs_future.result()
+    
+    if error:
+        # Oublier l'upload échoué : le bouton "Upload to IPFS" le relance
+        st.session_state.ipfs_future = None
+        st.session_state.ipfs_future_key = None
+    else:
+        st.session_state.ipfs_image_hash = ipfs_hash
+    
+    return ipfs_hash, error
+
 def optimize_image(image_bytes, max_size_kb=500):
     """Optimise l'image pour réduire sa taille"""
     img = Image.open(BytesIO(image_bytes))
@@ -96,12 +235,19 @@ def optimize_image(image_bytes, max_size_kb=500):
     if max(img.size) > max_dimension:
         img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
     
-    # Compresser
-    buffer = BytesIO()
-    img.save(buffer, format="JPEG", quality=85, optimize=True)
-    buffer.seek(0)
+    # Compresser (encodage baseline en une passe, qualité réduite si trop lourde)
+    for quality in (85, 75, 65):
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=quality, subsampling=2, progressive=False)
+        if buffer.tell() <= max_size_kb * 1024:
+            break
     
-    return buffer.read()
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def optimize_image_cached(sha256_hex, _image_bytes, max_size_kb=500):
+    """Version de optimize_image mise en cache par SHA256 de l'image source"""
+    return optimize_image(_image_bytes, max_size_kb)
 
 # --------------------------------------------------
 # UI
@@ -124,52 +270,63 @@ if not PINATA_API_KEY or not PINATA_SECRET_KEY:
 # WALLET CONNECTION
 # --------------------------------------------------
 
-st.header("👛 Wallet Connection")
-
-# Initialiser session_state pour la clé privée
-if 'private_key' not in st.session_state:
-    st.session_state.private_key = PRIVATE_KEY if PRIVATE_KEY else None
-
-wallet_option = st.radio(
-    "Choose wallet connection method:",
-    ["Use .env file", "Enter private key manually"],
-    horizontal=True
-)
-
-if wallet_option == "Enter private key manually":
-    private_key_input = st.text_input(
-        "🔑 Private Key",
-        type="password",
-        placeholder="0x...",
-        help="Your private key will not be stored"
+@st.fragment
+def wallet_section():
+    """Connexion du wallet (seul ce bloc est relancé lors des interactions)"""
+    previous_key = st.session_state.private_key
+    
+    st.header("👛 Wallet Connection")
+    
+    wallet_option = st.radio(
+        "Choose wallet connection method:",
+        ["Use .env file", "Enter private key manually"],
+        horizontal=True
     )
+
+    if wallet_option == "Enter private key manually":
+        private_key_input = st.text_input(
+            "🔑 Private Key",
+            type="password",
+            placeholder="0x...",
+            help="Your private key will not be stored"
+        )
     
-    if private_key_input:
-        # Nettoyer l'input (enlever espaces, ajouter 0x si manquant)
-        private_key_clean = private_key_input.strip()
-        if not private_key_clean.startswith("0x"):
-            private_key_clean = "0x" + private_key_clean
+        if private_key_input:
+            # Nettoyer l'input (enlever espaces, ajouter 0x si manquant)
+            private_key_clean = private_key_input.strip()
+            if not private_key_clean.startswith("0x"):
+                private_key_clean = "0x" + private_key_clean
         
-        try:
-            # Valider la clé privée
-            test_account = w3.eth.account.from_key(private_key_clean)
-            st.session_state.private_key = private_key_clean
-            st.success(f"✅ Wallet connected: `{test_account.address}`")
-        except Exception as e:
-            st.error(f"❌ Invalid private key: {str(e)}")
+            try:
+                # Valider la clé privée
+                test_account = get_account(private_key_clean)
+                st.session_state.private_key = private_key_clean
+                st.success(f"✅ Wallet connected: `{test_account.address}`")
+            except Exception as e:
+                st.error(f"❌ Invalid private key: {str(e)}")
+                st.session_state.private_key = None
+        else:
+            st.warning("⚠️ Please enter your private key")
             st.session_state.private_key = None
     else:
-        st.warning("⚠️ Please enter your private key")
-        st.session_state.private_key = None
-else:
-    # Utiliser la clé du .env
-    if PRIVATE_KEY:
-        st.session_state.private_key = PRIVATE_KEY
-        account = w3.eth.account.from_key(PRIVATE_KEY)
-        st.success(f"✅ Wallet from .env: `{account.address}`")
-    else:
-        st.error("❌ No private key found in .env file")
-        st.session_state.private_key = None
+        # Utiliser la clé du .env
+        if PRIVATE_KEY:
+            st.session_state.private_key = PRIVATE_KEY
+            account = account_from_env()
+            st.success(f"✅ Wallet from .env: `{account.address}`")
+        else:
+            st.error("❌ No private key found in .env file")
+            st.session_state.private_key = None
+    
+    # Le reste de l'app dépend du wallet : rerun complet si la clé a changé
+    if st.session_state.private_key != previous_key:
+        st.rerun()
+
+# Initialiser session_state pour la clé privée
+if 'private_key' not in st.session_state:
+    st.session_state.private_key = PRIVATE_KEY if PRIVATE_KEY else None
+
+wallet_section()
 
 # Vérifier qu'on a une clé privée valide
 if not st.session_state.private_key:
@@ -177,11 +334,8 @@ if not st.session_state.private_key:
     st.stop()
 
 # Créer l'account et le contract
-account = w3.eth.account.from_key(st.session_state.private_key)
-contract = w3.eth.contract(
-    address=Web3.to_checksum_address(CONTRACT_ADDRESS),
-    abi=CONTRACT_ABI
-)
+account = get_account(st.session_state.private_key)
+contract = get_contract(CONTRACT_ADDRESS)
 
 st.divider()
 
@@ -189,223 +343,303 @@ st.divider()
 # NFT IMAGE UPLOAD
 # --------------------------------------------------
 
-st.header("🖼️ Vault NFT Image")
-
-uploaded_image = st.file_uploader(
-    "Upload your NFT image (PNG/JPG)",
-    type=["png", "jpg", "jpeg"],
-    help="Will be stored on IPFS (decentralized storage)"
-)
-
 # Initialiser session_state
 if 'ipfs_image_hash' not in st.session_state:
     st.session_state.ipfs_image_hash = None
+if 'ipfs_future' not in st.session_state:
+    st.session_state.ipfs_future = None
+    st.session_state.ipfs_future_key = None
+
+@st.fragment
+def image_section():
+    """Upload et optimisation de l'image du NFT"""
+    st.header("🖼️ Vault NFT Image")
+    
+    uploaded_image = st.file_uploader(
+        "Upload your NFT image (PNG/JPG)",
+        type=["png", "jpg", "jpeg"],
+        help="Will be stored on IPFS (decentralized storage)"
+    )
 
-if uploaded_image:
-    image_bytes = uploaded_image.read()
+    if uploaded_image:
+        # Hash de l'image source (clé du cache d'optimisation), calculé en streaming
+        uploaded_image.seek(0)
+        image_hash = hashlib.file_digest(uploaded_image, "sha256").hexdigest()
+        
+        # UploadedFile est un BytesIO : getvalue() partage son buffer, sans relecture
+        image_bytes = uploaded_image.getvalue()
     
-    # Afficher l'image
-    st.image(image_bytes, caption="NFT preview", use_container_width=False, width=300)
+        # Afficher l'image
+        st.image(image_bytes, caption="NFT preview", use_container_width=False, width=300)
     
-    # Infos sur le fichier
-    file_size_kb = len(image_bytes) / 1024
-    st.info(f"📦 File size: {file_size_kb:.2f} KB")
+        # Infos sur le fichier
+        file_size_kb = len(image_bytes) / 1024
+        st.info(f"📦 File size: {file_size_kb:.2f} KB")
     
-    # Optimiser si trop grande
-    if file_size_kb > 500:
-        with st.spinner("Optimizing image..."):
-            image_bytes = optimize_image(image_bytes)
-            optimized_size_kb = len(image_bytes) / 1024
-            st.success(f"✅ Image optimized: {optimized_size_kb:.2f} KB")
+        # Optimiser si trop grande
+        if file_size_kb > 500:
+            with st.spinner("Optimizing image..."):
+                image_bytes = optimize_image_cached(image_hash, image_bytes)
+                optimized_size_kb = len(image_bytes) / 1024
+                st.success(f"✅ Image optimized: {optimized_size_kb:.2f} KB")
+        
+            # Hash de l'image optimisée
+            image_hash = hashlib.sha256(image_bytes).hexdigest()
+    
+        st.code(f"SHA256: {image_hash[:16]}...", language=None)
     
-    # Hash de l'image
-    image_hash = hashlib.sha256(image_bytes).hexdigest()
-    st.code(f"SHA256: {image_hash[:16]}...", language=None)
+        # Lancer l'upload IPFS en arrière-plan dès que l'image est prête
+        if st.session_state.ipfs_future_key != image_hash:
+            # Nouvelle image : oublier le CID de l'image précédente
+            st.session_state.ipfs_image_hash = None
+            st.session_state.ipfs_future = EXECUTOR.submit(
+                upload_to_pinata, image_bytes, uploaded_image.name, image_hash
+            )
+            st.session_state.ipfs_future_key = image_hash
     
-    # Upload vers IPFS
-    if st.button("📤 Upload to IPFS", use_container_width=True):
-        with st.spinner("Uploading to IPFS via Pinata..."):
-            ipfs_hash, error = upload_to_pinata(image_bytes, uploaded_image.name)
+        # Upload vers IPFS
+        if st.button("📤 Upload to IPFS", use_container_width=True):
+            with st.spinner("Uploading to IPFS via Pinata..."):
+                ipfs_hash, error = wait_for_image_upload()
             
-            if error:
-                st.error(f"❌ Upload failed: {error}")
-            else:
-                st.session_state.ipfs_image_hash = ipfs_hash
-                st.success(f"✅ Uploaded to IPFS!")
-                st.code(f"ipfs://{ipfs_hash}", language=None)
-                st.markdown(f"[View on IPFS Gateway](https://gateway.pinata.cloud/ipfs/{ipfs_hash})")
+                if error:
+                    st.error(f"❌ Upload failed: {error}")
+                    st.info("💡 Click \"Upload to IPFS\" again to retry")
+                else:
+                    st.success(f"✅ Uploaded to IPFS!")
+                    st.code(f"ipfs://{ipfs_hash}", language=None)
+                    st.markdown(f"[View on IPFS Gateway](https://gateway.pinata.cloud/ipfs/{ipfs_hash})")
+
+image_section()
+
+@st.fragment(run_every="2s")
+def image_status():
+    """Statut de l'upload IPFS, rafraîchi périodiquement (upload en arrière-plan, mint)"""
+    future = st.session_state.ipfs_future
+    if not st.session_state.ipfs_image_hash and future and future.done():
+        # Upload terminé : récupérer le CID (ou l'erreur) sans bloquer
+        _, error = wait_for_image_upload()
+        if error:
+            st.error(f"❌ Upload failed: {error}")
+    
+    if st.session_state.ipfs_image_hash:
+        st.success(f"✅ Image ready: `ipfs://{st.session_state.ipfs_image_hash}`")
+    elif st.session_state.ipfs_future:
+        st.info("⏳ Uploading image to IPFS in the background...")
+    else:
+        st.warning("⚠️ Please upload your image to IPFS before minting")
 
 # Afficher le statut de l'upload IPFS
-if st.session_state.ipfs_image_hash:
-    st.success(f"✅ Image ready: `ipfs://{st.session_state.ipfs_image_hash}`")
-else:
-    st.warning("⚠️ Please upload your image to IPFS before minting")
+image_status()
 
 # --------------------------------------------------
-# VAULT PARAMETERS
+# VAULT PARAMETERS + MINT + LOCK
 # --------------------------------------------------
 
-st.header("🔐 Vault parameters")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    eth_amount = st.number_input(
-        "ETH amount to lock",
-        min_value=0.00001,
-        step=0.00001,
-        format="%.5f"
-    )
-
-with col2:
-    unlock_date = st.date_input(
-        "Unlock date",
-        min_value=datetime.date.today()
+@st.fragment
+def mint_section():
+    """Paramètres du vault, création du vault et mint du NFT"""
+    st.header("🔐 Vault parameters")
+    
+    col1, col2 = st.columns(2)
+
+    with col1:
+        eth_amount = st.number_input(
+            "ETH amount to lock",
+            min_value=0.00001,
+            step=0.00001,
+            format="%.5f"
+        )
+
+    with col2:
+        unlock_date = st.date_input(
+            "Unlock date",
+            min_value=datetime.date.today()
+        )
+
+    unlock_ts = int(
+        datetime.datetime.combine(unlock_date, datetime.time.min).timestamp()
     )
+    
+    st.divider()
+    st.header("🚀 Create Vault & Mint NFT")
+    
+    if st.button("🔒 Lock ETH & Mint NFT", use_container_width=True, type="primary"):
 
-unlock_ts = int(
-    datetime.datetime.combine(unlock_date, datetime.time.min).timestamp()
-)
+        # Récupérer l'upload IPFS lancé en arrière-plan
+        if not st.session_state.ipfs_image_hash and st.session_state.ipfs_future:
+            with st.spinner("Waiting for image upload to IPFS..."):
+                _, error = wait_for_image_upload()
+        
+            if error:
+                st.error(f"❌ Image upload failed: {error}")
+                st.info("💡 Click \"Upload to IPFS\" to retry the image upload")
+                st.stop()
 
-# --------------------------------------------------
-# MINT + LOCK
-# --------------------------------------------------
+        if not st.session_state.ipfs_image_hash:
+            st.error("❌ Please upload your image to IPFS first")
+            st.stop()
 
-st.divider()
-st.header("🚀 Create Vault & Mint NFT")
-
-if st.button("🔒 Lock ETH & Mint NFT", use_container_width=True, type="primary"):
-
-    if not st.session_state.ipfs_image_hash:
-        st.error("❌ Please upload your image to IPFS first")
-        st.stop()
-
-    value = w3.to_wei(eth_amount, "ether")
-
-    # Créer les métadonnées
-    metadata = {
-        "name": "TimeVault Lock NFT",
-        "description": f"Proof of {eth_amount} ETH locked until {unlock_date}",
-        "image": f"ipfs://{st.session_state.ipfs_image_hash}",
-        "attributes": [
-            {"trait_type": "Unlock Date", "value": str(unlock_date)},
-            {"trait_type": "Amount", "value": f"{eth_amount} ETH"},
-            {"trait_type": "Network", "value": "Base"},
-            {"trait_type": "Unlock Timestamp", "value": unlock_ts}
-        ]
-    }
+        value = w3.to_wei(eth_amount, "ether")
+
+        # Créer les métadonnées
+        metadata = {
+            "name": "TimeVault Lock NFT",
+            "description": f"Proof of {eth_amount} ETH locked until {unlock_date}",
+            "image": f"ipfs://{st.session_state.ipfs_image_hash}",
+            "attributes": [
+                {"trait_type": "Unlock Date", "value": str(unlock_date)},
+                {"trait_type": "Amount", "value": f"{eth_amount} ETH"},
+                {"trait_type": "Network", "value": "Base"},
+                {"trait_type": "Unlock Timestamp", "value": unlock_ts}
+            ]
+        }
 
-    # Upload métadonnées vers IPFS
-    with st.spinner("Uploading metadata to IPFS..."):
-        metadata_hash, error = upload_metadata_to_pinata(metadata)
+        # Upload métadonnées vers IPFS (nonce et gas price récupérés en parallèle)
+        with st.spinner("Uploading metadata to IPFS..."):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                f_meta = pool.submit(upload_metadata_to_pinata, metadata)
+                f_nonce = pool.submit(w3.eth.get_transaction_count, account.address)
+                f_gas = pool.submit(current_gas_price)
+                metadata_hash, error = f_meta.result()
         
-        if error:
-            st.error(f"❌ Metadata upload failed: {error}")
-            st.stop()
+            if error:
+                st.error(f"❌ Metadata upload failed: {error}")
+                st.stop()
         
-        st.success(f"✅ Metadata uploaded: `{metadata_hash}`")
+            st.success(f"✅ Metadata uploaded: `{metadata_hash}`")
 
-    # Construire la transaction
-    token_uri = f"ipfs://{metadata_hash}"
+        # Construire la transaction
+        token_uri = f"ipfs://{metadata_hash}"
     
-    st.info(f"📝 Token URI: `{token_uri}`")
+        st.info(f"📝 Token URI: `{token_uri}`")
 
-    try:
-        nonce = w3.eth.get_transaction_count(account.address)
-
-        tx = contract.functions.deposit(
-            unlock_ts,
-            token_uri
-        ).build_transaction({
-            "from": account.address,
-            "value": value,
-            "nonce": nonce,
-            "gas": 300000,
-            "maxFeePerGas": w3.eth.gas_price + w3.to_wei(0.1, "gwei"),
-            "maxPriorityFeePerGas": w3.to_wei(0.1, "gwei"),
-            "chainId": CHAIN_ID
-        })
-
-        with st.spinner("Signing and sending transaction..."):
-            signed = w3.eth.account.sign_transaction(tx, st.session_state.private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction).hex()
-
-        st.success("✅ Vault created & NFT minted!")
-        st.balloons()
+        try:
+            nonce = f_nonce.result()
+            gas_price = f_gas.result()
+
+            tx = contract.functions.deposit(
+                unlock_ts,
+                token_uri
+            ).build_transaction({
+                "from": account.address,
+                "value": value,
+                "nonce": nonce,
+                "gas": 300000,
+                "maxFeePerGas": gas_price + GWEI_TIP,
+                "maxPriorityFeePerGas": GWEI_TIP,
+                "chainId": CHAIN_ID
+            })
+
+            with st.spinner("Signing and sending transaction..."):
+                signed = w3.eth.account.sign_transaction(tx, st.session_state.private_key)
+                tx_hash = Web3.to_hex(w3.eth.send_raw_transaction(signed.raw_transaction))
+
+            st.success("✅ Vault created & NFT minted!")
+            st.balloons()
         
-        st.markdown(f"**Transaction:** [{tx_hash[:16]}...]({EXPLORER}/tx/{tx_hash})")
-        st.markdown(f"**Image:** [View on IPFS](https://gateway.pinata.cloud/ipfs/{st.session_state.ipfs_image_hash})")
-        st.markdown(f"**Metadata:** [View on IPFS](https://gateway.pinata.cloud/ipfs/{metadata_hash})")
+            st.markdown(f"**Transaction:** [{tx_hash[:16]}...]({EXPLORER}/tx/{tx_hash})")
+            st.markdown(f"**Image:** [View on IPFS](https://gateway.pinata.cloud/ipfs/{st.session_state.ipfs_image_hash})")
+            st.markdown(f"**Metadata:** [View on IPFS](https://gateway.pinata.cloud/ipfs/{metadata_hash})")
         
-        # Réinitialiser après le mint
-        st.session_state.ipfs_image_hash = None
+            # Réinitialiser après le mint
+            st.session_state.ipfs_image_hash = None
+            st.session_state.ipfs_future = None
+            st.session_state.ipfs_future_key = None
         
-    except Exception as e:
-        st.error(f"❌ Transaction failed: {str(e)}")
+        except Exception as e:
+            st.error(f"❌ Transaction failed: {str(e)}")
+
+mint_section()
 
 # --------------------------------------------------
 # WITHDRAW (AUTO-BURN NFT)
 # --------------------------------------------------
 
 st.divider()
-st.header("🔓 Withdraw ETH")
-
-st.warning("⚠️ **Important:** The NFT will be automatically burned (destroyed) after withdrawing your ETH. This action is irreversible!")
 
-vault_id_input = st.number_input("Vault ID", min_value=1, step=1, key="vault_id")
-
-if st.button("💸 Withdraw ETH & Burn NFT", use_container_width=True, type="primary"):
-    try:
-        # Récupérer le tokenId associé au vaultId
-        token_id = contract.functions.getTokenIdByVault(vault_id_input).call()
-        
-        # Étape 1: Withdraw ETH
-        with st.spinner("Step 1/2: Withdrawing ETH..."):
-            nonce = w3.eth.get_transaction_count(account.address)
-
-            tx = contract.functions.withdraw(vault_id_input).build_transaction({
-                "from": account.address,
-                "nonce": nonce,
-                "gas": 200000,
-                "maxFeePerGas": w3.eth.gas_price + w3.to_wei(0.1, "gwei"),
-                "maxPriorityFeePerGas": w3.to_wei(0.1, "gwei"),
-                "chainId": CHAIN_ID
-            })
+@st.fragment
+def withdraw_section():
+    """Retrait des ETH et burn automatique du NFT"""
+    st.header("🔓 Withdraw ETH")
+    
+    st.warning("⚠️ **Important:** The NFT will be automatically burned (destroyed) after withdrawing your ETH. This action is irreversible!")
 
-            signed = w3.eth.account.sign_transaction(tx, st.session_state.private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction).hex()
+    vault_id_input = st.number_input("Vault ID", min_value=1, step=1, key="vault_id")
 
-        st.success("✅ ETH withdrawn successfully!")
-        st.markdown(f"**Withdrawal transaction:** [{tx_hash[:16]}...]({EXPLORER}/tx/{tx_hash})")
+    if st.button("💸 Withdraw ETH & Burn NFT", use_container_width=True, type="primary"):
+        broadcast = False
+        try:
+            # Récupérer le tokenId associé au vaultId
+            token_id = contract.functions.getTokenIdByVault(vault_id_input).call()
         
-        # Étape 2: Burn automatique du NFT
-        with st.spinner("Step 2/2: Burning NFT..."):
-            import time
-            time.sleep(3)  # Attendre confirmation de la transaction précédente
+            # Vérifier que le withdraw passe avant de diffuser quoi que ce soit
+            with st.spinner("Checking vault..."):
+                nonce = simulate_withdraw(contract, vault_id_input, account.address)
             
-            nonce = w3.eth.get_transaction_count(account.address)
+            # Pré-signer withdraw (nonce n) et burn (nonce n+1), puis les envoyer ensemble
+            with st.spinner("Signing withdraw & burn transactions..."):
+                gas_price = current_gas_price()
+
+                tx = contract.functions.withdraw(vault_id_input).build_transaction({
+                    "from": account.address,
+                    "nonce": nonce,
+                    "gas": 200000,
+                    "maxFeePerGas": gas_price + GWEI_TIP,
+                    "maxPriorityFeePerGas": GWEI_TIP,
+                    "chainId": CHAIN_ID
+                })
+
+                # Utiliser le tokenId, pas le vaultId
+                burn_tx = contract.functions.burn(token_id).build_transaction({
+                    "from": account.address,
+                    "nonce": nonce + 1,
+                    "gas": 150000,
+                    "maxFeePerGas": gas_price + GWEI_TIP,
+                    "maxPriorityFeePerGas": GWEI_TIP,
+                    "chainId": CHAIN_ID
+                })
+
+                signed = w3.eth.account.sign_transaction(tx, st.session_state.private_key)
+                signed_burn = w3.eth.account.sign_transaction(burn_tx, st.session_state.private_key)
+                send_raw_transactions([signed, signed_burn])
+                broadcast = True
+                tx_hash = Web3.to_hex(signed.hash)
+                burn_tx_hash = Web3.to_hex(signed_burn.hash)
             
-            # Utiliser le tokenId, pas le vaultId
-            burn_tx = contract.functions.burn(token_id).build_transaction({
-                "from": account.address,
-                "nonce": nonce,
-                "gas": 150000,
-                "maxFeePerGas": w3.eth.gas_price + w3.to_wei(0.1, "gwei"),
-                "maxPriorityFeePerGas": w3.to_wei(0.1, "gwei"),
-                "chainId": CHAIN_ID
-            })
+            # Liens affichés dès l'envoi, avant d'attendre les confirmations
+            st.markdown(f"**Withdrawal transaction:** [{tx_hash[:16]}...]({EXPLORER}/tx/{tx_hash})")
+            st.markdown(f"**Burn transaction:** [{burn_tx_hash[:16]}...]({EXPLORER}/tx/{burn_tx_hash})")
             
-            signed_burn = w3.eth.account.sign_transaction(burn_tx, st.session_state.private_key)
-            burn_tx_hash = w3.eth.send_raw_transaction(signed_burn.raw_transaction).hex()
+            # Étape 1: Withdraw ETH
+            with st.spinner("Step 1/2: Withdrawing ETH..."):
+                receipt = w3.eth.wait_for_transaction_receipt(signed.hash, timeout=30, poll_latency=0.5)
+                if receipt.status != 1:
+                    raise RuntimeError(f"Withdraw transaction reverted ({tx_hash})")
+
+            st.success("✅ ETH withdrawn successfully!")
         
-        st.success("🔥 NFT burned successfully!")
-        st.markdown(f"**Burn transaction:** [{burn_tx_hash[:16]}...]({EXPLORER}/tx/{burn_tx_hash})")
-        st.info(f"🎫 Token ID {token_id} has been permanently destroyed")
-        st.balloons()
+            # Étape 2: Burn automatique du NFT
+            with st.spinner("Step 2/2: Burning NFT..."):
+                burn_receipt = w3.eth.wait_for_transaction_receipt(signed_burn.hash, timeout=30, poll_latency=0.5)
+                if burn_receipt.status != 1:
+                    raise RuntimeError(f"Burn transaction reverted ({burn_tx_hash})")
         
-    except Exception as e:
-        st.error(f"❌ Operation failed: {str(e)}")
-        st.info("💡 Make sure the vault is unlocked and you own the NFT")
+            st.success("🔥 NFT burned successfully!")
+            st.info(f"🎫 Token ID {token_id} has been permanently destroyed")
+            st.balloons()
+        
+        except TimeExhausted:
+            st.warning("⏳ Transactions sent but not confirmed after 30s: they are still pending, follow them with the links above")
+        
+        except Exception as e:
+            st.error(f"❌ Operation failed: {str(e)}")
+            if broadcast:
+                st.info("💡 Transactions were already sent: check their status with the links above")
+            else:
+                st.info("💡 Make sure the vault is unlocked and you own the NFT")
+
+withdraw_section()
 
 # --------------------------------------------------
 # INFO SECTION